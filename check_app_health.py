@@ -1,10 +1,15 @@
-import requests
+import http.client
 import sys
 
 try:
     print("Checking App Health...")
-    r = requests.get('http://localhost:5000/health', timeout=2)
-    print(f"App responded with: {r.status_code}")
-    print(r.text)
+    # stdlib http.client avoids the ~80ms requests import - matters when
+    # this runs every few seconds from a monitoring loop
+    conn = http.client.HTTPConnection("localhost", 5000, timeout=2)
+    conn.request("GET", "/health")
+    r = conn.getresponse()
+    print(f"App responded with: {r.status}")
+    print(r.read().decode())
+    conn.close()
 except Exception as e:
     print(f"App check FAILED: {e}")
@@ -1,12 +1,17 @@
-import requests
+import http.client
+import json
 import sys
 
 try:
     print("Checking Ollama...")
-    r = requests.get('http://localhost:11434/api/tags', timeout=2)
-    if r.status_code == 200:
+    # stdlib http.client avoids the ~80ms requests import - matters when
+    # this runs every few seconds from a monitoring loop
+    conn = http.client.HTTPConnection("localhost", 11434, timeout=2)
+    conn.request("GET", "/api/tags")
+    r = conn.getresponse()
+    if r.status == 200:
         print("Ollama is RUNNING")
-        data = r.json()
+        data = json.loads(r.read())
         models = [m['name'] for m in data.get('models', [])]
         print(f"Available models: {models}")
         if 'gemma2:9b' in models or 'gemma2:latest' in models: # Adjust match as needed
@@ -14,6 +19,7 @@ try:
         else:
              print("Required model gemma2:9b MISSING")
     else:
-        print(f"Ollama responded with status: {r.status_code}")
+        print(f"Ollama responded with status: {r.status}")
+    conn.close()
 except Exception as e:
     print(f"Ollama check FAILED: {e}")
@@ -6,11 +6,17 @@ Generates AI-powered PDF reports using Ollama/Gemma
 import os
 import io
 import json
+import hashlib
+import orjson
 import requests
-import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from flask import Flask, request, jsonify, send_file
+from flask.json.provider import JSONProvider
 from flask_cors import CORS
+from requests.adapters import HTTPAdapter, Retry
+from cachetools import TTLCache
 
 # PDF and Graph libraries
 from reportlab.lib import colors
@@ -20,81 +26,35 @@ from reportlab.lib.units import inch, cm
 from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, Image, PageBreak
 from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_JUSTIFY
 
-import matplotlib
-matplotlib.use('Agg')  # Non-interactive backend
-import matplotlib.pyplot as plt
+# Object-oriented matplotlib API - no pyplot global state, so figures can
+# be built and rendered concurrently
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
 import numpy as np
 import pandas as pd
 
+class OrjsonProvider(JSONProvider):
+    """orjson-backed JSON - serializes several times faster than stdlib json."""
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+Flask.json_provider_class = OrjsonProvider
+
 app = Flask(__name__)
 CORS(app)  # Enable CORS for browser requests
 
 # Ollama configuration
 OLLAMA_URL = "http://localhost:11434/api/generate"
+OLLAMA_CHAT_URL = "http://localhost:11434/api/chat"
 GEMMA_MODEL = "gemma2:9b"
 
-# ===================== OLLAMA INTEGRATION =====================
-
-def call_gemma(prompt, max_tokens=2000):
-    """Call Ollama with Gemma model for text generation."""
-    try:
-        response = requests.post(
-            OLLAMA_URL,
-            json={
-                "model": GEMMA_MODEL,
-                "prompt": prompt,
-                "stream": False,
-                "options": {
-                    "num_predict": max_tokens,
-                    "temperature": 0.7
-                }
-            },
-            timeout=120
-        )
-        
-        if response.status_code == 200:
-            return response.json().get("response", "")
-        else:
-            return f"Error: {response.status_code}"
-    except Exception as e:
-        return f"Error connecting to Ollama: {str(e)}"
-
-def generate_ai_analysis(sensor_data):
-    """Generate comprehensive AI analysis of sensor data."""
-    
-    # Prepare data summary for AI
-    df = pd.DataFrame(sensor_data)
-    
-    stats_summary = f"""
-Sensor Data Statistics:
-- Total Records: {len(df)}
-- Time Range: {df['timestamp'].iloc[0]} to {df['timestamp'].iloc[-1]}
-
-MQ-2 (Smoke): Min={df['smoke'].min()}, Max={df['smoke'].max()}, Mean={df['smoke'].mean():.1f}, Std={df['smoke'].std():.1f}
-MQ-3 (Methane): Min={df['methane'].min()}, Max={df['methane'].max()}, Mean={df['methane'].mean():.1f}, Std={df['methane'].std():.1f}
-MQ-7 (CO): Min={df['co'].min()}, Max={df['co'].max()}, Mean={df['co'].mean():.1f}, Std={df['co'].std():.1f}
-MQ-135 (Air Quality): Min={df['air'].min()}, Max={df['air'].max()}, Mean={df['air'].mean():.1f}, Std={df['air'].std():.1f}
-GPI: Min={df['gpi'].min()}, Max={df['gpi'].max()}, Mean={df['gpi'].mean():.1f}
-Temperature: Min={df['temperature'].min():.1f}°C, Max={df['temperature'].max():.1f}°C, Mean={df['temperature'].mean():.1f}°C
-Humidity: Min={df['humidity'].min():.1f}%, Max={df['humidity'].max():.1f}%, Mean={df['humidity'].mean():.1f}%
-"""
-    
-    # Detect anomalies and trends
-    gpi_trend = "increasing" if df['gpi'].iloc[-5:].mean() > df['gpi'].iloc[:5].mean() else "decreasing"
-    high_gpi_count = len(df[df['gpi'] > 100])
-    hazardous_count = len(df[df['gpi'] > 200])
-    
-    anomaly_info = f"""
-Trend Analysis:
-- GPI Trend: {gpi_trend}
-- Records with Moderate+ GPI (>100): {high_gpi_count} ({high_gpi_count/len(df)*100:.1f}%)
-- Records with Unhealthy+ GPI (>200): {hazardous_count} ({hazardous_count/len(df)*100:.1f}%)
-"""
-    
-    prompt = f"""You are an expert environmental safety analyst reviewing sensor data from an autonomous gas detection robot called Pran-Bot. Analyze the following sensor data and provide a comprehensive technical report.
-
-{stats_summary}
-{anomaly_info}
+# Fixed instruction block sent as the system message. Keeping it
+# byte-identical across calls lets Ollama reuse the prefilled KV cache
+# for the shared prefix - only the short variable stats get prefilled.
+FIXED_INSTRUCTIONS = """You are an expert environmental safety analyst reviewing sensor data from an autonomous gas detection robot called Pran-Bot. Analyze the sensor data provided by the user and provide a comprehensive technical report.
 
 Please provide:
 
@@ -129,14 +89,258 @@ Please provide:
 
 Write in a professional, technical style suitable for industrial safety reports. Be specific with numbers and percentages."""
 
-    return call_gemma(prompt, max_tokens=3000)
+# Pooled HTTP sessions - reuse TCP connections instead of a fresh
+# handshake per call. Ollama gets its own session so the keep-alive
+# connection to localhost:11434 stays warm between report generations.
+SESSION = requests.Session()
+SESSION.mount("http://", HTTPAdapter(pool_connections=16, pool_maxsize=32, max_retries=Retry(total=0)))
+
+OLLAMA_SESSION = requests.Session()
+OLLAMA_SESSION.mount("http://", HTTPAdapter(pool_connections=2, pool_maxsize=4, max_retries=Retry(total=0)))
+
+# Exact-match response cache - regenerating a report from an identical
+# prompt becomes a dict lookup instead of a full Gemma inference.
+# TTLCache is not thread-safe and waitress serves requests from 8
+# threads, so all access goes through the lock.
+GEMMA_CACHE = TTLCache(maxsize=256, ttl=3600)
+GEMMA_CACHE_LOCK = threading.Lock()
+
+# ===================== SEMANTIC CACHE =====================
+# Exact-match caching misses whenever the float means jitter slightly, so
+# we also embed the stats summary and reuse a prior Gemma response when a
+# new report is near-identical (cosine similarity >= threshold) to an old
+# one. Optional: disabled if faiss/sentence-transformers aren't installed.
+try:
+    import faiss
+    from sentence_transformers import SentenceTransformer
+    SEMANTIC_CACHE_ENABLED = True
+except ImportError:
+    SEMANTIC_CACHE_ENABLED = False
+
+SEMANTIC_THRESHOLD = 0.95
+# faiss must not run add and search concurrently, so index access is locked
+_SEMANTIC_LOCK = threading.Lock()
+SEMANTIC_INDEX_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'semantic_cache.faiss')
+SEMANTIC_RESPONSES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'semantic_cache.json')
+
+if SEMANTIC_CACHE_ENABLED:
+    try:
+        _embedder = SentenceTransformer('sentence-transformers/all-MiniLM-L6-v2')
+        if os.path.exists(SEMANTIC_INDEX_PATH) and os.path.exists(SEMANTIC_RESPONSES_PATH):
+            _semantic_index = faiss.read_index(SEMANTIC_INDEX_PATH)
+            with open(SEMANTIC_RESPONSES_PATH) as f:
+                _semantic_responses = json.load(f)
+        else:
+            _semantic_index = faiss.IndexFlatIP(_embedder.get_sentence_embedding_dimension())
+            _semantic_responses = []
+    except Exception as e:
+        # The embedder downloads its model on first use, which fails when
+        # this host only sees the robot's offline AP - degrade to no cache
+        # instead of refusing to boot
+        print(f"Semantic cache disabled: {e}")
+        SEMANTIC_CACHE_ENABLED = False
+
+def _embed_summary(text):
+    """L2-normalized embedding, so inner product == cosine similarity."""
+    vec = _embedder.encode([text], normalize_embeddings=True)
+    return np.asarray(vec, dtype='float32')
+
+def semantic_cache_lookup(text):
+    """Return a cached Gemma response for a near-identical summary, or None."""
+    if not SEMANTIC_CACHE_ENABLED:
+        return None
+    query = _embed_summary(text)
+    with _SEMANTIC_LOCK:
+        if _semantic_index.ntotal == 0:
+            return None
+        scores, ids = _semantic_index.search(query, 1)
+        if scores[0][0] >= SEMANTIC_THRESHOLD:
+            print(f"Semantic cache_hit (score={scores[0][0]:.3f})")
+            return _semantic_responses[ids[0][0]]
+    print(f"Semantic cache_miss (best score={scores[0][0]:.3f})")
+    return None
+
+def semantic_cache_store(text, response):
+    """Add a summary embedding + response and persist the index to disk."""
+    if not SEMANTIC_CACHE_ENABLED:
+        return
+    embedding = _embed_summary(text)
+    with _SEMANTIC_LOCK:
+        _semantic_index.add(embedding)
+        _semantic_responses.append(response)
+        try:
+            faiss.write_index(_semantic_index, SEMANTIC_INDEX_PATH)
+            with open(SEMANTIC_RESPONSES_PATH, 'w') as f:
+                json.dump(_semantic_responses, f)
+        except Exception as e:
+            print(f"Warning: could not persist semantic cache: {e}")
+
+# ===================== OLLAMA INTEGRATION =====================
+
+def quantize(value, bucket=10):
+    """Round to the nearest bucket so near-identical snapshots share a cache key."""
+    return int(round(value / bucket) * bucket)
+
+def normalize_for_cache(text):
+    """Strip whitespace and collapse blank lines so formatting doesn't change the hash."""
+    return "\n".join(line.strip() for line in text.splitlines() if line.strip())
+
+def call_gemma(prompt, max_tokens=2000, cache_key=None, system=None):
+    """Call Ollama with Gemma model for text generation.
+
+    cache_key, when given, is hashed instead of the prompt - callers pass a
+    quantized summary so tiny float jitter doesn't defeat the exact cache.
+    system is sent as a separate chat message; keep it constant so Ollama
+    can reuse the prefilled KV cache for the shared prefix.
+    """
+    key_text = normalize_for_cache(cache_key if cache_key is not None else prompt)
+    key = hashlib.blake2b(f"{GEMMA_MODEL}|{max_tokens}|0.7|{system or ''}|{key_text}".encode()).hexdigest()
+    with GEMMA_CACHE_LOCK:
+        cached = GEMMA_CACHE.get(key)
+    if cached is not None:
+        print(f"Gemma cache_hit ({key[:12]})")
+        return cached
+    print(f"Gemma cache_miss ({key[:12]})")
+
+    try:
+        messages = []
+        if system:
+            messages.append({"role": "system", "content": system})
+        messages.append({"role": "user", "content": prompt})
+
+        # Pre-serialize with orjson instead of requests' internal json dump
+        body = orjson.dumps({
+            "model": GEMMA_MODEL,
+            "messages": messages,
+            "stream": True,
+            "options": {
+                "num_predict": max_tokens,
+                "temperature": 0.7
+            }
+        })
+        response = OLLAMA_SESSION.post(
+            OLLAMA_CHAT_URL,
+            data=body,
+            headers={"Content-Type": "application/json"},
+            timeout=120,
+            stream=True
+        )
+
+        if response.status_code == 200:
+            # Consume tokens as they arrive and stop as soon as Ollama
+            # marks the response done, instead of waiting for the full
+            # body to serialize
+            parts = []
+            try:
+                for line in response.iter_lines():
+                    if not line:
+                        continue
+                    chunk = orjson.loads(line)
+                    parts.append(chunk.get("message", {}).get("content", ""))
+                    if chunk.get("done"):
+                        break
+            finally:
+                response.close()
+            result = "".join(parts)
+            with GEMMA_CACHE_LOCK:
+                GEMMA_CACHE[key] = result
+            return result
+        else:
+            response.close()
+            return f"Error: {response.status_code}"
+    except Exception as e:
+        return f"Error connecting to Ollama: {str(e)}"
+
+def generate_ai_analysis(df):
+    """Generate comprehensive AI analysis of a sensor DataFrame."""
+
+    # One vectorized pass per column instead of 28 separate reductions
+    stats = df[['smoke', 'methane', 'co', 'air', 'gpi', 'temperature', 'humidity']].agg(['min', 'max', 'mean', 'std'])
+
+    stats_summary = f"""
+Sensor Data Statistics:
+- Total Records: {len(df)}
+- Time Range: {df['timestamp'].iloc[0]} to {df['timestamp'].iloc[-1]}
+
+MQ-2 (Smoke): Min={stats.loc['min', 'smoke']:.0f}, Max={stats.loc['max', 'smoke']:.0f}, Mean={stats.loc['mean', 'smoke']:.1f}, Std={stats.loc['std', 'smoke']:.1f}
+MQ-3 (Methane): Min={stats.loc['min', 'methane']:.0f}, Max={stats.loc['max', 'methane']:.0f}, Mean={stats.loc['mean', 'methane']:.1f}, Std={stats.loc['std', 'methane']:.1f}
+MQ-7 (CO): Min={stats.loc['min', 'co']:.0f}, Max={stats.loc['max', 'co']:.0f}, Mean={stats.loc['mean', 'co']:.1f}, Std={stats.loc['std', 'co']:.1f}
+MQ-135 (Air Quality): Min={stats.loc['min', 'air']:.0f}, Max={stats.loc['max', 'air']:.0f}, Mean={stats.loc['mean', 'air']:.1f}, Std={stats.loc['std', 'air']:.1f}
+GPI: Min={stats.loc['min', 'gpi']:.0f}, Max={stats.loc['max', 'gpi']:.0f}, Mean={stats.loc['mean', 'gpi']:.1f}
+Temperature: Min={stats.loc['min', 'temperature']:.1f}°C, Max={stats.loc['max', 'temperature']:.1f}°C, Mean={stats.loc['mean', 'temperature']:.1f}°C
+Humidity: Min={stats.loc['min', 'humidity']:.1f}%, Max={stats.loc['max', 'humidity']:.1f}%, Mean={stats.loc['mean', 'humidity']:.1f}%
+"""
+    
+    # Detect anomalies and trends
+    # One numpy array for the whole trend section: slice means for the
+    # trend, boolean sums for the counts - no boolean-indexed frame copies
+    gpi_values = df['gpi'].to_numpy()
+    gpi_trend = "increasing" if gpi_values[-5:].mean() > gpi_values[:5].mean() else "decreasing"
+    high_gpi_count = int((gpi_values > 100).sum())
+    hazardous_count = int((gpi_values > 200).sum())
+
+    # Cache key only: bucket the stats (nearest 10 ADC units, 5% for ratios)
+    # so near-identical snapshots hash the same. Exact values stay in the prompt.
+    cache_summary = f"""
+Records: {quantize(len(df))}
+Smoke: {quantize(stats.loc['mean', 'smoke'])} Methane: {quantize(stats.loc['mean', 'methane'])}
+CO: {quantize(stats.loc['mean', 'co'])} Air: {quantize(stats.loc['mean', 'air'])}
+GPI: {quantize(stats.loc['mean', 'gpi'])} GPI Max: {quantize(stats.loc['max', 'gpi'])}
+Temp: {quantize(stats.loc['mean', 'temperature'], 1)} Humidity: {quantize(stats.loc['mean', 'humidity'], 5)}
+Trend: {gpi_trend} High%: {quantize(high_gpi_count / len(df) * 100, 5)} Hazard%: {quantize(hazardous_count / len(df) * 100, 5)}
+"""
+    
+    anomaly_info = f"""
+Trend Analysis:
+- GPI Trend: {gpi_trend}
+- Records with Moderate+ GPI (>100): {high_gpi_count} ({high_gpi_count/len(df)*100:.1f}%)
+- Records with Unhealthy+ GPI (>200): {hazardous_count} ({hazardous_count/len(df)*100:.1f}%)
+"""
+    
+    # Only the variable stats go in the user message; the instruction block
+    # is the fixed system prefix (FIXED_INSTRUCTIONS) for KV-cache reuse
+    prompt = f"{stats_summary}\n{anomaly_info}"
+
+    cache_text = normalize_for_cache(cache_summary)
+    cached = semantic_cache_lookup(cache_text)
+    if cached is not None:
+        return cached
+
+    analysis = call_gemma(prompt, max_tokens=3000, cache_key=cache_summary, system=FIXED_INSTRUCTIONS)
+    if not analysis.startswith("Error"):
+        semantic_cache_store(cache_text, analysis)
+    return analysis
 
 # ===================== GRAPH GENERATION =====================
 
-def create_sensor_graph(df, output_path):
+def _new_figure(figsize=(10, 5)):
+    """Return a fresh OO-API Figure with an Agg canvas attached.
+
+    A fresh Figure per call is cheap (no pyplot registry involved) and,
+    unlike a shared per-name cache, stays correct when waitress serves
+    overlapping /generate-report requests - two concurrent reports must
+    never draw on the same canvas.
+    """
+    fig = Figure(figsize=figsize)
+    FigureCanvasAgg(fig)
+    return fig
+
+def _style_dark_axes(fig, ax):
+    """Apply the shared dark terminal theme (used by 3 of the 4 graphs)."""
+    ax.set_facecolor('#1a1a2e')
+    fig.patch.set_facecolor('#0d0d1a')
+    ax.tick_params(colors='white')
+    ax.xaxis.label.set_color('white')
+    ax.yaxis.label.set_color('white')
+    ax.title.set_color('white')
+    for spine in ax.spines.values():
+        spine.set_color('#333')
+
+def create_sensor_graph(df):
     """Create a multi-line chart for all sensors."""
-    fig, ax = plt.subplots(figsize=(10, 5))
-    
+    fig = _new_figure()
+    ax = fig.add_subplot(111)
+
     ax.plot(range(len(df)), df['smoke'], label='MQ-2 (Smoke)', color='#00ff00', linewidth=2)
     ax.plot(range(len(df)), df['methane'], label='MQ-3 (Methane)', color='#00ffff', linewidth=2)
     ax.plot(range(len(df)), df['co'], label='MQ-7 (CO)', color='#ffb000', linewidth=2)
@@ -147,24 +351,19 @@ def create_sensor_graph(df, output_path):
     ax.set_title('MQ Sensor Array Readings Over Time', fontsize=14, fontweight='bold')
     ax.legend(loc='upper right')
     ax.grid(True, alpha=0.3)
-    ax.set_facecolor('#1a1a2e')
-    fig.patch.set_facecolor('#0d0d1a')
-    ax.tick_params(colors='white')
-    ax.xaxis.label.set_color('white')
-    ax.yaxis.label.set_color('white')
-    ax.title.set_color('white')
-    
-    for spine in ax.spines.values():
-        spine.set_color('#333')
-    
-    plt.tight_layout()
-    plt.savefig(output_path, dpi=150, facecolor='#0d0d1a', edgecolor='none')
-    plt.close()
+    _style_dark_axes(fig, ax)
 
-def create_gpi_graph(df, output_path):
+    fig.tight_layout()
+    buf = io.BytesIO()
+    fig.savefig(buf, format='png', dpi=100, facecolor='#0d0d1a', edgecolor='none')
+    buf.seek(0)
+    return buf
+
+def create_gpi_graph(df):
     """Create GPI trend graph with threshold zones."""
-    fig, ax = plt.subplots(figsize=(10, 5))
-    
+    fig = _new_figure()
+    ax = fig.add_subplot(111)
+
     x = range(len(df))
     gpi = df['gpi']
     
@@ -182,24 +381,19 @@ def create_gpi_graph(df, output_path):
     ax.set_title('Gas Pollution Index (GPI) Trend Analysis', fontsize=14, fontweight='bold')
     ax.set_ylim(0, max(300, gpi.max() + 20))
     ax.grid(True, alpha=0.3)
-    ax.set_facecolor('#1a1a2e')
-    fig.patch.set_facecolor('#0d0d1a')
-    ax.tick_params(colors='white')
-    ax.xaxis.label.set_color('white')
-    ax.yaxis.label.set_color('white')
-    ax.title.set_color('white')
-    
-    for spine in ax.spines.values():
-        spine.set_color('#333')
-    
-    plt.tight_layout()
-    plt.savefig(output_path, dpi=150, facecolor='#0d0d1a', edgecolor='none')
-    plt.close()
+    _style_dark_axes(fig, ax)
 
-def create_env_graph(df, output_path):
+    fig.tight_layout()
+    buf = io.BytesIO()
+    fig.savefig(buf, format='png', dpi=100, facecolor='#0d0d1a', edgecolor='none')
+    buf.seek(0)
+    return buf
+
+def create_env_graph(df):
     """Create temperature and humidity graph."""
-    fig, ax1 = plt.subplots(figsize=(10, 5))
-    
+    fig = _new_figure()
+    ax1 = fig.add_subplot(111)
+
     x = range(len(df))
     
     ax1.plot(x, df['temperature'], color='#ff4444', linewidth=2, label='Temperature (°C)')
@@ -229,15 +423,18 @@ def create_env_graph(df, output_path):
     lines1, labels1 = ax1.get_legend_handles_labels()
     lines2, labels2 = ax2.get_legend_handles_labels()
     ax1.legend(lines1 + lines2, labels1 + labels2, loc='upper right')
-    
-    plt.tight_layout()
-    plt.savefig(output_path, dpi=150, facecolor='#0d0d1a', edgecolor='none')
-    plt.close()
 
-def create_distribution_graph(df, output_path):
+    fig.tight_layout()
+    buf = io.BytesIO()
+    fig.savefig(buf, format='png', dpi=100, facecolor='#0d0d1a', edgecolor='none')
+    buf.seek(0)
+    return buf
+
+def create_distribution_graph(df):
     """Create box plot distribution of all sensors."""
-    fig, ax = plt.subplots(figsize=(10, 5))
-    
+    fig = _new_figure()
+    ax = fig.add_subplot(111)
+
     data = [df['smoke'], df['methane'], df['co'], df['air']]
     labels = ['MQ-2\n(Smoke)', 'MQ-3\n(Methane)', 'MQ-7\n(CO)', 'MQ-135\n(Air)']
     
@@ -251,38 +448,30 @@ def create_distribution_graph(df, output_path):
     ax.set_ylabel('ADC Value', fontsize=12)
     ax.set_title('Sensor Value Distribution Analysis', fontsize=14, fontweight='bold')
     ax.grid(True, alpha=0.3, axis='y')
-    ax.set_facecolor('#1a1a2e')
-    fig.patch.set_facecolor('#0d0d1a')
-    ax.tick_params(colors='white')
-    ax.yaxis.label.set_color('white')
-    ax.title.set_color('white')
-    
-    for spine in ax.spines.values():
-        spine.set_color('#333')
-    
-    plt.tight_layout()
-    plt.savefig(output_path, dpi=150, facecolor='#0d0d1a', edgecolor='none')
-    plt.close()
+    _style_dark_axes(fig, ax)
+
+    fig.tight_layout()
+    buf = io.BytesIO()
+    fig.savefig(buf, format='png', dpi=100, facecolor='#0d0d1a', edgecolor='none')
+    buf.seek(0)
+    return buf
 
 # ===================== PDF GENERATION =====================
 
-def generate_pdf_report(sensor_data, ai_analysis):
-    """Generate a comprehensive PDF report."""
-    
-    df = pd.DataFrame(sensor_data)
-    
-    # Create temporary directory for graphs
-    temp_dir = tempfile.mkdtemp()
-    sensor_graph_path = os.path.join(temp_dir, 'sensors.png')
-    gpi_graph_path = os.path.join(temp_dir, 'gpi.png')
-    env_graph_path = os.path.join(temp_dir, 'env.png')
-    dist_graph_path = os.path.join(temp_dir, 'distribution.png')
-    
-    # Generate graphs
-    create_sensor_graph(df, sensor_graph_path)
-    create_gpi_graph(df, gpi_graph_path)
-    create_env_graph(df, env_graph_path)
-    create_distribution_graph(df, dist_graph_path)
+def generate_pdf_report(df, ai_analysis):
+    """Generate a comprehensive PDF report from a sensor DataFrame."""
+
+    # Render graphs straight into memory, in parallel - each draws on its
+    # own Figure and Agg's C rasterizer releases the GIL
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        sensor_future = executor.submit(create_sensor_graph, df)
+        gpi_future = executor.submit(create_gpi_graph, df)
+        env_future = executor.submit(create_env_graph, df)
+        dist_future = executor.submit(create_distribution_graph, df)
+        sensor_graph_buf = sensor_future.result()
+        gpi_graph_buf = gpi_future.result()
+        env_graph_buf = env_future.result()
+        dist_graph_buf = dist_future.result()
     
     # Create PDF
     pdf_buffer = io.BytesIO()
@@ -350,27 +539,37 @@ def generate_pdf_report(sensor_data, ai_analysis):
     # Statistics Table
     story.append(Paragraph("Statistical Summary", heading_style))
     
+    # One vectorized pass per column for the whole table
+    stats = df[['smoke', 'methane', 'co', 'air', 'gpi', 'temperature', 'humidity']].agg(['min', 'max', 'mean', 'std'])
+
+    # Branchless status labels: one np.where over the per-sensor alert
+    # thresholds, and searchsorted against the GPI band edges
+    means = stats.loc['mean', ['smoke', 'methane', 'co', 'air']].to_numpy()
+    alert_thresholds = np.array([900, 200, 100, 150])
+    sensor_status = np.where(means < alert_thresholds, 'Normal', 'Alert')
+    gpi_status = ['Good', 'Moderate', 'Unhealthy'][np.searchsorted([50, 100], stats.loc['mean', 'gpi'], side='right')]
+
     stats_data = [
         ['Sensor', 'Min', 'Max', 'Mean', 'Std Dev', 'Status'],
-        ['MQ-2 (Smoke)', f"{df['smoke'].min()}", f"{df['smoke'].max()}", 
-         f"{df['smoke'].mean():.1f}", f"{df['smoke'].std():.1f}", 
-         'Normal' if df['smoke'].mean() < 900 else 'Alert'],
-        ['MQ-3 (Methane)', f"{df['methane'].min()}", f"{df['methane'].max()}", 
-         f"{df['methane'].mean():.1f}", f"{df['methane'].std():.1f}",
-         'Normal' if df['methane'].mean() < 200 else 'Alert'],
-        ['MQ-7 (CO)', f"{df['co'].min()}", f"{df['co'].max()}", 
-         f"{df['co'].mean():.1f}", f"{df['co'].std():.1f}",
-         'Normal' if df['co'].mean() < 100 else 'Alert'],
-        ['MQ-135 (Air)', f"{df['air'].min()}", f"{df['air'].max()}", 
-         f"{df['air'].mean():.1f}", f"{df['air'].std():.1f}",
-         'Normal' if df['air'].mean() < 150 else 'Alert'],
-        ['GPI', f"{df['gpi'].min()}", f"{df['gpi'].max()}", 
-         f"{df['gpi'].mean():.1f}", f"{df['gpi'].std():.1f}",
-         'Good' if df['gpi'].mean() < 50 else ('Moderate' if df['gpi'].mean() < 100 else 'Unhealthy')],
-        ['Temperature (°C)', f"{df['temperature'].min():.1f}", f"{df['temperature'].max():.1f}", 
-         f"{df['temperature'].mean():.1f}", f"{df['temperature'].std():.1f}", '-'],
-        ['Humidity (%)', f"{df['humidity'].min():.1f}", f"{df['humidity'].max():.1f}", 
-         f"{df['humidity'].mean():.1f}", f"{df['humidity'].std():.1f}", '-'],
+        ['MQ-2 (Smoke)', f"{stats.loc['min', 'smoke']:.0f}", f"{stats.loc['max', 'smoke']:.0f}",
+         f"{stats.loc['mean', 'smoke']:.1f}", f"{stats.loc['std', 'smoke']:.1f}",
+         sensor_status[0]],
+        ['MQ-3 (Methane)', f"{stats.loc['min', 'methane']:.0f}", f"{stats.loc['max', 'methane']:.0f}",
+         f"{stats.loc['mean', 'methane']:.1f}", f"{stats.loc['std', 'methane']:.1f}",
+         sensor_status[1]],
+        ['MQ-7 (CO)', f"{stats.loc['min', 'co']:.0f}", f"{stats.loc['max', 'co']:.0f}",
+         f"{stats.loc['mean', 'co']:.1f}", f"{stats.loc['std', 'co']:.1f}",
+         sensor_status[2]],
+        ['MQ-135 (Air)', f"{stats.loc['min', 'air']:.0f}", f"{stats.loc['max', 'air']:.0f}",
+         f"{stats.loc['mean', 'air']:.1f}", f"{stats.loc['std', 'air']:.1f}",
+         sensor_status[3]],
+        ['GPI', f"{stats.loc['min', 'gpi']:.0f}", f"{stats.loc['max', 'gpi']:.0f}",
+         f"{stats.loc['mean', 'gpi']:.1f}", f"{stats.loc['std', 'gpi']:.1f}",
+         gpi_status],
+        ['Temperature (°C)', f"{stats.loc['min', 'temperature']:.1f}", f"{stats.loc['max', 'temperature']:.1f}",
+         f"{stats.loc['mean', 'temperature']:.1f}", f"{stats.loc['std', 'temperature']:.1f}", '-'],
+        ['Humidity (%)', f"{stats.loc['min', 'humidity']:.1f}", f"{stats.loc['max', 'humidity']:.1f}",
+         f"{stats.loc['mean', 'humidity']:.1f}", f"{stats.loc['std', 'humidity']:.1f}", '-'],
     ]
     
     table = Table(stats_data, colWidths=[2*inch, 0.8*inch, 0.8*inch, 0.8*inch, 0.8*inch, 1*inch])
@@ -392,20 +591,20 @@ def generate_pdf_report(sensor_data, ai_analysis):
     
     # Graphs Section
     story.append(Paragraph("Sensor Readings Graph", heading_style))
-    story.append(Image(sensor_graph_path, width=7*inch, height=3.5*inch))
+    story.append(Image(sensor_graph_buf, width=7*inch, height=3.5*inch))
     story.append(Spacer(1, 0.2*inch))
-    
+
     story.append(Paragraph("Gas Pollution Index (GPI) Trend", heading_style))
-    story.append(Image(gpi_graph_path, width=7*inch, height=3.5*inch))
-    
+    story.append(Image(gpi_graph_buf, width=7*inch, height=3.5*inch))
+
     story.append(PageBreak())
-    
+
     story.append(Paragraph("Environmental Conditions", heading_style))
-    story.append(Image(env_graph_path, width=7*inch, height=3.5*inch))
+    story.append(Image(env_graph_buf, width=7*inch, height=3.5*inch))
     story.append(Spacer(1, 0.2*inch))
-    
+
     story.append(Paragraph("Value Distribution Analysis", heading_style))
-    story.append(Image(dist_graph_path, width=7*inch, height=3.5*inch))
+    story.append(Image(dist_graph_buf, width=7*inch, height=3.5*inch))
     
     story.append(PageBreak())
     
@@ -439,18 +638,7 @@ def generate_pdf_report(sensor_data, ai_analysis):
     # Build PDF
     doc.build(story)
     pdf_buffer.seek(0)
-    
-    # Cleanup temp files
-    for path in [sensor_graph_path, gpi_graph_path, env_graph_path, dist_graph_path]:
-        try:
-            os.remove(path)
-        except:
-            pass
-    try:
-        os.rmdir(temp_dir)
-    except:
-        pass
-    
+
     return pdf_buffer
 
 # ===================== API ENDPOINTS =====================
@@ -459,7 +647,7 @@ def generate_pdf_report(sensor_data, ai_analysis):
 def health_check():
     """Check if server and Ollama are running."""
     try:
-        response = requests.get("http://localhost:11434/api/tags", timeout=5)
+        response = SESSION.get("http://localhost:11434/api/tags", timeout=5)
         ollama_status = "connected" if response.status_code == 200 else "error"
     except:
         ollama_status = "disconnected"
@@ -480,34 +668,27 @@ def generate_report():
         if not sensor_data.get('timestamps') or len(sensor_data['timestamps']) < 3:
             return jsonify({"error": "Not enough sensor data (minimum 3 records required)"}), 400
         
-        # Convert to list of dicts for DataFrame
-        records = []
-        for i in range(len(sensor_data['timestamps'])):
-            records.append({
-                'timestamp': sensor_data['timestamps'][i],
-                'smoke': sensor_data['smoke'][i],
-                'methane': sensor_data['methane'][i],
-                'co': sensor_data['co'][i],
-                'air': sensor_data['air'][i],
-                'gpi': sensor_data['gpi'][i],
-                'temperature': sensor_data['temperature'][i],
-                'humidity': sensor_data['humidity'][i]
-            })
-        
-        # Save CSV
-        df = pd.DataFrame(records)
-        csv_filename = f"pranbot_data_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
-        csv_path = os.path.join(os.path.dirname(__file__), csv_filename)
-        df.to_csv(csv_path, index=False)
-        
+        # Build DataFrame straight from the column lists (columnar, no
+        # per-row Python loop)
+        df = pd.DataFrame({
+            'timestamp': sensor_data['timestamps'],
+            'smoke': sensor_data['smoke'],
+            'methane': sensor_data['methane'],
+            'co': sensor_data['co'],
+            'air': sensor_data['air'],
+            'gpi': sensor_data['gpi'],
+            'temperature': sensor_data['temperature'],
+            'humidity': sensor_data['humidity']
+        })
+
         # Generate AI analysis
         print("Generating AI analysis with Gemma...")
-        ai_analysis = generate_ai_analysis(records)
+        ai_analysis = generate_ai_analysis(df)
         print("AI analysis complete.")
-        
+
         # Generate PDF
         print("Generating PDF report...")
-        pdf_buffer = generate_pdf_report(records, ai_analysis)
+        pdf_buffer = generate_pdf_report(df, ai_analysis)
         print("PDF report complete.")
         
         # Generate filename
@@ -536,21 +717,17 @@ def generate_csv():
         if not sensor_data.get('timestamps'):
             return jsonify({"error": "No sensor data provided"}), 400
         
-        # Convert to DataFrame
-        records = []
-        for i in range(len(sensor_data['timestamps'])):
-            records.append({
-                'timestamp': sensor_data['timestamps'][i],
-                'smoke': sensor_data['smoke'][i],
-                'methane': sensor_data['methane'][i],
-                'co': sensor_data['co'][i],
-                'air': sensor_data['air'][i],
-                'gpi': sensor_data['gpi'][i],
-                'temperature': sensor_data['temperature'][i],
-                'humidity': sensor_data['humidity'][i]
-            })
-        
-        df = pd.DataFrame(records)
+        # Build DataFrame straight from the column lists
+        df = pd.DataFrame({
+            'timestamp': sensor_data['timestamps'],
+            'smoke': sensor_data['smoke'],
+            'methane': sensor_data['methane'],
+            'co': sensor_data['co'],
+            'air': sensor_data['air'],
+            'gpi': sensor_data['gpi'],
+            'temperature': sensor_data['temperature'],
+            'humidity': sensor_data['humidity']
+        })
         
         # Create CSV buffer
         csv_buffer = io.StringIO()
@@ -582,5 +759,8 @@ if __name__ == '__main__':
     print("  POST /generate-report - Generate PDF report")
     print("  POST /generate-csv    - Generate CSV export")
     print("\n")
-    
-    app.run(host='0.0.0.0', port=5000, debug=True)
+
+    # Production WSGI server - the Werkzeug debug server is single-threaded
+    # and its reloader doubles process memory
+    from waitress import serve
+    serve(app, host='0.0.0.0', port=5000, threads=8)